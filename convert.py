@@ -1,23 +1,120 @@
 #!/usr/bin/env python3
+import collections
+import itertools
 import json
 import os
 import sys
 from datetime import datetime
-import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import regex as re
+except ImportError:
+    import re
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Exports larger than this are streamed with ijson (or, without it, parsed with
+# the stdlib json module, which peaks lower than orjson) instead of loaded whole
+_STREAM_THRESHOLD = 64 * 1024 * 1024
+
+try:
+    # Possessive quantifiers keep failed matches from backtracking into the attributes
+    _ANT_TAG_RE = re.compile(
+        r'<antArtifact\s++([^>]*+)>(.*?)</antArtifact>|<antThinking>.*?</antThinking>',
+        re.DOTALL,
+    )
+except re.error:
+    # The stdlib re module only supports possessive quantifiers since Python 3.11
+    _ANT_TAG_RE = re.compile(
+        r'<antArtifact\s+([^>]*?)>(.*?)</antArtifact>|<antThinking>.*?</antThinking>',
+        re.DOTALL,
+    )
+_ATTR_RE = re.compile(r'(\w+)="([^"]+)"')
+_DASHES_RE = re.compile(r'-+')
+# orjson silently turns integers outside 64 bits (19+ digits) into floats
+_LONG_DIGITS_RE = re.compile(rb'[0-9]{19}')
+# Export timestamps that are valid whatever the month; days 29-31 and any
+# other shape are left to datetime.fromisoformat
+_TIMESTAMP_RE = re.compile(
+    r'(?!0000)[0-9]{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|1[0-9]|2[0-8])'
+    r'T(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](?:\.[0-9]{6}|\.[0-9]{3})?'
+    r'(?:Z|[+-](?:[01][0-9]|2[0-3]):[0-5][0-9])?'
+)
+
+def _format_code(content, language, title_line):
+    """Fenced code block, using the artifact language if it has one"""
+    return f"\n```{language or ''}\n{content}\n```\n"
+
+# Artifact formatters by type; unknown or missing types fall back to _format_code
+_ARTIFACT_FORMATTERS = {
+    "application/vnd.ant.code": _format_code,
+    "application/vnd.ant.mermaid": lambda content, language, title_line: f"\n```mermaid\n{content}\n```\n",
+    # React components - use jsx
+    "application/vnd.ant.react": lambda content, language, title_line: f"\n```jsx\n{content}\n```\n",
+    # HTML artifacts
+    "application/vnd.ant.html": lambda content, language, title_line: f"\n```html\n{content}\n```\n",
+    # Plain HTML
+    "text/html": lambda content, language, title_line: f"\n```html\n{content}\n```\n",
+    # Markdown content - just include as-is with a separator
+    "text/markdown": lambda content, language, title_line: f"\n---\n\n{title_line}{content}\n\n---\n",
+    # SVG images
+    "image/svg+xml": lambda content, language, title_line: f"\n```svg\n{content}\n```\n",
+}
+
+class _TranslationTable(dict):
+    """str.translate table that computes and caches entries for unseen codepoints"""
+    def __init__(self, entries, default):
+        super().__init__(entries)
+        self.default = default
+    
+    def __missing__(self, codepoint):
+        value = self[codepoint] = self.default(chr(codepoint))
+        return value
+
+# Filenames: invalid characters become '_', non-printable characters are dropped
+_FILENAME_TABLE = _TranslationTable(
+    {ord(c): '_' for c in '<>:"/\\|?*'},
+    lambda char: char if char.isprintable() else None,
+)
+
+# Slugs: keep [a-z0-9-], whitespace becomes '-', everything else is dropped
+_SLUG_TABLE = _TranslationTable(
+    {ord(c): c for c in 'abcdefghijklmnopqrstuvwxyz0123456789-'},
+    lambda char: '-' if char.isspace() else None,
+)
+
+def _truncate_utf8(text, max_bytes):
+    """Truncate text to at most max_bytes of UTF-8 without splitting a character"""
+    data = text.encode('utf-8')
+    if len(data) <= max_bytes:
+        return text
+    # Dropping the partial trailing sequence trims back to a codepoint boundary
+    return data[:max_bytes].decode('utf-8', 'ignore')
 
 def sanitize_filename(text):
     """Remove or replace characters that are invalid in filenames"""
     if not text:
         return "untitled"
-    # Replace invalid characters with underscores
-    text = re.sub(r'[<>:"/\\|?*]', '_', text)
-    # Remove any non-printable characters
-    text = ''.join(char for char in text if char.isprintable())
-    # Limit length to avoid filesystem issues
-    return text[:100].strip()
+    # Replace invalid characters with underscores and remove non-printable ones
+    text = text.translate(_FILENAME_TABLE)
+    # Limit length (in UTF-8 bytes) to avoid filesystem issues
+    return _truncate_utf8(text, 100).strip()
 
 def convert_timestamp_to_filename(timestamp_str):
     """Convert ISO timestamp to yyyy-mm-dd format"""
+    # Well-formed export timestamps start with the date, so slice it off directly
+    if isinstance(timestamp_str, str) and _TIMESTAMP_RE.fullmatch(timestamp_str):
+        return timestamp_str[:10]
     try:
         dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
         return dt.strftime('%Y-%m-%d')
@@ -26,64 +123,33 @@ def convert_timestamp_to_filename(timestamp_str):
 
 def convert_artifact_to_markdown(text):
     """Convert antArtifact tags to markdown code blocks and handle all types"""
-    import re
+    # Most messages have no artifact or thinking tags at all
+    if '<ant' not in text:
+        return text
     
-    # First, let's find all artifact tags to analyze them
-    all_artifacts_pattern = r'<antArtifact\s+([^>]*?)>(.*?)</antArtifact>'
-    
-    def analyze_artifact(match):
+    def analyze_tag(match):
+        # Remove antThinking tags (these are internal thinking, not meant for output)
+        if match.group(0).startswith('<antThinking'):
+            return ''
+        
         attributes = match.group(1)
         content = match.group(2)
         
-        # Extract type attribute if present
-        type_match = re.search(r'type="([^"]+)"', attributes)
-        artifact_type = type_match.group(1) if type_match else None
-        
-        # Extract language attribute if present
-        lang_match = re.search(r'language="([^"]+)"', attributes)
-        language = lang_match.group(1) if lang_match else None
-        
-        # Extract title if present
-        title_match = re.search(r'title="([^"]+)"', attributes)
-        title = title_match.group(1) if title_match else None
+        # Extract type, language and title attributes if present
+        attrs = dict(_ATTR_RE.findall(attributes))
+        artifact_type = attrs.get('type')
+        language = attrs.get('language')
+        title = attrs.get('title')
         
         # Add title as a comment if present
         title_line = f"# {title}\n\n" if title else ""
         
-        # Handle all known types
-        if artifact_type == "application/vnd.ant.code" and language:
-            return f"\n```{language}\n{content}\n```\n"
-        elif artifact_type == "application/vnd.ant.mermaid":
-            return f"\n```mermaid\n{content}\n```\n"
-        elif artifact_type == "application/vnd.ant.react":
-            # React components - use jsx
-            return f"\n```jsx\n{content}\n```\n"
-        elif artifact_type == "application/vnd.ant.html":
-            # HTML artifacts
-            return f"\n```html\n{content}\n```\n"
-        elif artifact_type == "text/html":
-            # Plain HTML
-            return f"\n```html\n{content}\n```\n"
-        elif artifact_type == "text/markdown":
-            # Markdown content - just include as-is with a separator
-            return f"\n---\n\n{title_line}{content}\n\n---\n"
-        elif artifact_type == "image/svg+xml":
-            # SVG images
-            return f"\n```svg\n{content}\n```\n"
-        elif language:
-            # Has language but different/no type
-            return f"\n```{language}\n{content}\n```\n"
-        else:
-            # Default to plain code block
-            return f"\n```\n{content}\n```\n"
-    
-    # Replace all artifacts
-    text = re.sub(all_artifacts_pattern, analyze_artifact, text, flags=re.DOTALL)
+        # Format known types, defaulting to a (language-tagged) code block
+        formatter = _ARTIFACT_FORMATTERS.get(artifact_type, _format_code)
+        return formatter(content, language, title_line)
     
-    # Remove antThinking tags (these are internal thinking, not meant for output)
-    text = re.sub(r'<antThinking>.*?</antThinking>', '', text, flags=re.DOTALL)
-    
-    return text
+    # Replace all artifacts and thinking blocks in a single pass
+    return _ANT_TAG_RE.sub(analyze_tag, text)
 
 def extract_message_text(message):
     """Extract text from message, handling both direct text and content array"""
@@ -91,11 +157,8 @@ def extract_message_text(message):
         text = message['text']
     elif 'content' in message and message['content']:
         # Concatenate text from all content items
-        texts = []
-        for item in message['content']:
-            if isinstance(item, dict) and 'text' in item:
-                texts.append(item['text'])
-        text = '\n'.join(texts)
+        text = '\n'.join(item['text'] for item in message['content']
+                          if isinstance(item, dict) and 'text' in item)
     else:
         return ""
     
@@ -103,77 +166,201 @@ def extract_message_text(message):
     return convert_artifact_to_markdown(text)
 
 def convert_conversation_to_markdown(conversation):
-    """Convert a single conversation to markdown format"""
-    markdown_lines = []
+    """Convert a single conversation to UTF-8 encoded markdown"""
+    buf = bytearray()
     
-    # Add YAML frontmatter
-    markdown_lines.append("---")
-    markdown_lines.append(f"uuid: {conversation.get('uuid', 'unknown')}")
-    markdown_lines.append(f"name: {conversation.get('name', 'untitled')}")
-    markdown_lines.append(f"summary: {conversation.get('summary', 'No summary available')}")
-    markdown_lines.append(f"created_at: {conversation.get('created_at', 'unknown')}")
-    markdown_lines.append(f"updated_at: {conversation.get('updated_at', 'unknown')}")
-    markdown_lines.append("---")
-    markdown_lines.append("")  # Blank line after frontmatter
+    # Add YAML frontmatter, followed by a blank line
+    buf += f"""---
+uuid: {conversation.get('uuid', 'unknown')}
+name: {conversation.get('name', 'untitled')}
+summary: {conversation.get('summary', 'No summary available')}
+created_at: {conversation.get('created_at', 'unknown')}
+updated_at: {conversation.get('updated_at', 'unknown')}
+---
+""".encode('utf-8')
     
     # Add title if available
     if conversation.get('name'):
-        markdown_lines.append(f"# {conversation['name']}\n")
+        buf += f"\n# {conversation['name']}\n".encode('utf-8')
     
     # Process messages
+    extract = extract_message_text
     for message in conversation.get('chat_messages', []):
         sender = message.get('sender', 'unknown')
-        text = extract_message_text(message)
+        text = extract(message)
         
         if not text:
             continue
             
         # Determine header based on sender
         if sender.lower() == 'human':
-            markdown_lines.append("## User")
+            buf += b"\n## User\n"
         elif sender.lower() in ['assistant', 'claude']:
-            markdown_lines.append("## Assistant")
+            buf += b"\n## Assistant\n"
         else:
-            markdown_lines.append(f"## {sender}")
+            buf += f"\n## {sender}\n".encode('utf-8')
         
-        markdown_lines.append(text)
-        markdown_lines.append("")  # Add blank line between messages
+        buf += text.encode('utf-8')
+        buf += b"\n"  # Add blank line between messages
     
-    return '\n'.join(markdown_lines)
+    return buf
 
 def slugify(text):
     """Convert text to a URL-friendly slug"""
     if not text:
         return "untitled"
-    # Convert to lowercase
-    text = text.lower()
-    # Replace spaces with hyphens
-    text = re.sub(r'\s+', '-', text)
-    # Remove non-alphanumeric characters (except hyphens)
-    text = re.sub(r'[^a-z0-9-]', '', text)
-    # Remove multiple consecutive hyphens
-    text = re.sub(r'-+', '-', text)
-    # Strip leading/trailing hyphens
-    text = text.strip('-')
+    # Lowercase, turn whitespace into hyphens and drop everything else but [a-z0-9-]
+    text = text.lower().translate(_SLUG_TABLE)
+    # Collapse consecutive hyphens and strip leading/trailing ones
+    text = _DASHES_RE.sub('-', text).strip('-')
     # Limit length
-    return text[:100] if text else "untitled"
+    return _truncate_utf8(text, 100) if text else "untitled"
+
+_USAGE = """\
+Usage: python3 convert_conversations.py [INPUT_FILE] [OUTPUT_DIR] [LIMIT]
+
+Convert Claude.ai conversation exports to Markdown files
+
+Arguments:
+  INPUT_FILE   Path to conversations.json file (default: conversations.json)
+  OUTPUT_DIR   Output directory for markdown files (default: output)
+  LIMIT        Maximum number of conversations to convert (default: all)
+
+Examples:
+  python3 convert_conversations.py
+  python3 convert_conversations.py conversations.json output
+  python3 convert_conversations.py conversations.json my_notes 100
+  python3 convert_conversations.py ~/Downloads/conversations.json ~/Documents/claude-notes
+"""
 
 def print_usage():
     """Print usage information"""
-    print("Usage: python3 convert_conversations.py [INPUT_FILE] [OUTPUT_DIR] [LIMIT]")
-    print()
-    print("Convert Claude.ai conversation exports to Markdown files")
-    print()
-    print("Arguments:")
-    print("  INPUT_FILE   Path to conversations.json file (default: conversations.json)")
-    print("  OUTPUT_DIR   Output directory for markdown files (default: output)")
-    print("  LIMIT        Maximum number of conversations to convert (default: all)")
-    print()
-    print("Examples:")
-    print("  python3 convert_conversations.py")
-    print("  python3 convert_conversations.py conversations.json output")
-    print("  python3 convert_conversations.py conversations.json my_notes 100")
-    print("  python3 convert_conversations.py ~/Downloads/conversations.json ~/Documents/claude-notes")
+    sys.stdout.write(_USAGE)
+
+def convert_conversation(conversation):
+    """Convert a conversation, returning a (filename, data, error) tuple"""
+    try:
+        # Generate filename
+        timestamp = conversation.get('created_at', '')
+        date_time_str = convert_timestamp_to_filename(timestamp)
+        
+        # Use the conversation name (which becomes H1 header) for the filename
+        title = conversation.get('name', 'untitled')
+        slugified_title = slugify(title)
+        
+        filename = f"{date_time_str}-{slugified_title}.md"
+        
+        # Convert to markdown
+        data = convert_conversation_to_markdown(conversation)
+        return filename, data, None
+    except Exception as e:
+        return None, None, str(e)
+
+def convert_batch(conversations):
+    """Convert a batch of conversations inside a worker process"""
+    convert = convert_conversation
+    return [convert(conversation) for conversation in conversations]
+
+def _convert_batch_isolated(batch):
+    """Convert a batch in its own worker process, failing it if the worker dies"""
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(convert_batch, batch).result()
+    except BrokenProcessPool as e:
+        return [(None, None, str(e))] * len(batch)
+
+def convert_in_parallel(conversations, batch_size=32):
+    """Convert conversations across worker processes, yielding results in input order
+    
+    Small inputs and single-CPU machines are converted inline, where a process
+    pool would only add startup and pickling overhead.
+    """
+    conversations = iter(conversations)
+    head = list(itertools.islice(conversations, batch_size + 1))
+    conversations = itertools.chain(head, conversations)
+    cpu_count = os.cpu_count() or 1
+    if cpu_count == 1 or len(head) <= batch_size:
+        yield from map(convert_conversation, conversations)
+        return
+    
+    # Bound the number of in-flight batches so streamed input isn't read all at once
+    max_pending = 2 * cpu_count
+    pending = collections.deque()
+    unsubmitted = None
+    try:
+        with ProcessPoolExecutor() as executor:
+            for batch in iter(lambda: list(itertools.islice(conversations, batch_size)), []):
+                unsubmitted = batch
+                pending.append((batch, executor.submit(convert_batch, batch)))
+                unsubmitted = None
+                if len(pending) >= max_pending:
+                    yield from pending[0][1].result()
+                    pending.popleft()
+            while pending:
+                yield from pending[0][1].result()
+                pending.popleft()
+    except BrokenProcessPool:
+        # A worker died and took the pool down. Keep the batches that finished,
+        # re-run the rest one at a time in a fresh worker so only the batch that
+        # crashes again is failed, then carry on with a new pool
+        if unsubmitted is not None:
+            pending.append((unsubmitted, None))
+        for batch, future in pending:
+            if future is not None and not future.cancelled() and future.exception() is None:
+                yield from future.result()
+            else:
+                yield from _convert_batch_isolated(batch)
+        yield from convert_in_parallel(conversations, batch_size)
+
+def write_file(filepath, data):
+    """Write bytes to a file with a single raw open/write/close"""
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def parse_json(data):
+    """Parse JSON bytes, using orjson when it can represent the input exactly"""
+    if orjson is not None and not _LONG_DIGITS_RE.search(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects input the stdlib accepts, such as NaN and lone
+            # surrogates; retry so those behave (and fail) as they always did
+            pass
+    return json.loads(data)
+
+def _ijson_error_message(error):
+    """Return a clean one-line message for an ijson parse error"""
+    # The yajl backends report multi-line messages, sometimes as bytes
+    message = error.args[0] if error.args else ''
+    if isinstance(message, bytes):
+        message = message.decode('utf-8', 'replace')
+    return str(message).strip().split('\n', 1)[0]
+
+def _starts_with_list(f):
+    """Check whether a JSON file's top level is a list, then rewind it"""
+    while True:
+        chunk = f.read(4096)
+        stripped = chunk.lstrip(b' \t\r\n')
+        if stripped or not chunk:
+            f.seek(0)
+            return stripped[:1] == b'['
+
+def stream_conversations(f):
+    """Yield conversations one at a time from an open export file, closing it when done"""
+    try:
+        with f:
+            yield from ijson.items(f, 'item', use_float=True)
+    except ijson.JSONError as e:
+        print(f"Error parsing JSON: {_ijson_error_message(e)}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
 
 def main():
     # Parse command-line arguments
@@ -216,35 +403,68 @@ def main():
     
     # Load the conversations
     print(f"Loading conversations from: {input_file}")
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        sys.exit(1)
-    
-    # Validate it's a list
-    if not isinstance(conversations, list):
-        print("Error: JSON file should contain a list of conversations")
-        sys.exit(1)
-    
-    total_conversations = len(conversations)
-    print(f"Found {total_conversations} conversations")
+    large_file = os.path.getsize(input_file) > _STREAM_THRESHOLD
+    if large_file and ijson is not None:
+        # Stream conversations so each one is written before the next is parsed
+        try:
+            f = open(input_file, 'rb')
+            is_list = _starts_with_list(f)
+            if not is_list:
+                # Report malformed input as a parse error rather than as a non-list
+                next(ijson.parse(f))
+        except ijson.JSONError as e:
+            print(f"Error parsing JSON: {_ijson_error_message(e)}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"Error reading file: {e}")
+            sys.exit(1)
+        
+        # Validate it's a list
+        if not is_list:
+            print("Error: JSON file should contain a list of conversations")
+            sys.exit(1)
+        
+        conversations = stream_conversations(f)
+        total_conversations = None
+    else:
+        try:
+            if large_file:
+                with open(input_file, 'r', encoding='utf-8') as f:
+                    conversations = json.load(f)
+            else:
+                with open(input_file, 'rb') as f:
+                    conversations = parse_json(f.read())
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON: {e}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"Error reading file: {e}")
+            sys.exit(1)
+        
+        # Validate it's a list
+        if not isinstance(conversations, list):
+            print("Error: JSON file should contain a list of conversations")
+            sys.exit(1)
+        
+        total_conversations = len(conversations)
+        print(f"Found {total_conversations} conversations")
     
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory: {output_dir}")
     
     # Apply limit if specified
-    if limit:
-        conversations_to_process = conversations[:limit]
-        print(f"Processing first {len(conversations_to_process)} conversations (limit: {limit})")
+    conversations_to_process = itertools.islice(conversations, limit) if limit else conversations
+    if total_conversations is None:
+        # Streaming: the total is only known once the input is exhausted
+        process_count = None
+        print(f"Processing first {limit} conversations" if limit else "Processing all conversations")
+    elif limit:
+        process_count = min(limit, total_conversations)
+        print(f"Processing first {process_count} conversations (limit: {limit})")
     else:
-        conversations_to_process = conversations
-        print(f"Processing all {len(conversations_to_process)} conversations")
+        process_count = total_conversations
+        print(f"Processing all {process_count} conversations")
     
     print("-" * 60)
     
@@ -252,33 +472,33 @@ def main():
     successful = 0
     failed = 0
     
-    for i, conversation in enumerate(conversations_to_process):
-        try:
-            print(f"Processing conversation {i+1}/{len(conversations_to_process)}...", end='')
-            
-            # Generate filename
-            timestamp = conversation.get('created_at', '')
-            date_time_str = convert_timestamp_to_filename(timestamp)
-            
-            # Use the conversation name (which becomes H1 header) for the filename
-            title = conversation.get('name', 'untitled')
-            slugified_title = slugify(title)
-            
-            filename = f"{date_time_str}-{slugified_title}.md"
-            filepath = os.path.join(output_dir, filename)
-            
-            # Convert to markdown
-            markdown_content = convert_conversation_to_markdown(conversation)
-            
-            # Write to file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-            
-            print(f" ✓ {filename}")
+    # Bind hot-loop lookups to locals, and build file paths as bytes from a
+    # pre-encoded directory prefix rather than calling os.path.join each time
+    write = write_file
+    path_prefix = os.path.join(os.fsencode(output_dir), b'')
+    fs_encoding = sys.getfilesystemencoding()
+    fs_errors = sys.getfilesystemencodeerrors()
+    
+    for i, (filename, data, error) in enumerate(convert_in_parallel(conversations_to_process)):
+        progress = f"{i+1}/{process_count}" if process_count is not None else f"{i+1}"
+        
+        # Write to file
+        if error is None:
+            try:
+                write(path_prefix + filename.encode(fs_encoding, fs_errors), data)
+            except OSError as e:
+                # Report the path as text rather than as the bytes passed to os.open
+                if isinstance(e.filename, bytes):
+                    e.filename = os.fsdecode(e.filename)
+                error = str(e)
+            except Exception as e:
+                error = str(e)
+        
+        if error is None:
+            print(f"Processing conversation {progress}... ✓ {filename}")
             successful += 1
-            
-        except Exception as e:
-            print(f" ✗ Failed: {e}")
+        else:
+            print(f"Processing conversation {progress}... ✗ Failed: {error}")
             failed += 1
     
     # Print summary
@@ -289,7 +509,7 @@ def main():
         print(f"  Failed: {failed}")
     print(f"  Output directory: {output_dir}/")
     
-    if limit and limit < total_conversations:
+    if limit and total_conversations is not None and limit < total_conversations:
         remaining = total_conversations - limit
         print(f"  Remaining conversations: {remaining} (use higher limit to convert more)")
 